@@ -1,13 +1,28 @@
 import os
 import psycopg2
-from psycopg2.extras import execute_values
+from psycopg2.extras import execute_values, Json
 from basic.logger import get_logger
-from typing import List, Dict, Any
+from basic.sketches import DailySalesSketch, merge_daily_sketches
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
 
+class DayOwnershipLost(Exception):
+    pass
+
+
 class PostgreSQLStorage:
+    PURCHASE_INSERT_SQL = """
+        INSERT INTO purchase (
+            client_id, gender, product_id, quantity,
+            price_per_item, discount_per_item, total_price,
+            purchase_datetime, purchase_time_as_seconds_from_midnight
+        ) VALUES %s
+    """
+    DAY_LOCK_NAMESPACE = 20250101
+
     def __init__(self, service_name: str = "ETL_Storage"):
         # ✅ КРИТИЧНО: Загрузка config ПЕРЕД подключением!
         config_path = Path("config/config.env")
@@ -54,10 +69,75 @@ class PostgreSQLStorage:
         )
         """
         self.cursor.execute(table_sql)
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_purchase_datetime ON purchase (purchase_datetime)"
+        )
         self.logger.info("Таблица 'purchase' создана")
 
+    def ensure_sketch_table_exists(self):
+        table_sql = """
+        CREATE TABLE IF NOT EXISTS daily_sales_sketch (
+            sale_date DATE PRIMARY KEY,
+            sketch JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+        """
+        self.cursor.execute(table_sql)
+        self.logger.info("Таблица 'daily_sales_sketch' создана")
+
+    def ensure_load_log_table_exists(self):
+        table_sql = """
+        CREATE TABLE IF NOT EXISTS etl_load_log (
+            load_date DATE PRIMARY KEY,
+            status VARCHAR(16) NOT NULL,
+            processed INTEGER DEFAULT 0,
+            stored INTEGER DEFAULT 0,
+            errors INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 1,
+            finished_at TIMESTAMP DEFAULT NOW()
+        )
+        """
+        self.cursor.execute(table_sql)
+        self.logger.info("Таблица 'etl_load_log' создана")
+
+    def ensure_backfill_queue_table_exists(self):
+        table_sql = """
+        CREATE TABLE IF NOT EXISTS backfill_queue (
+            load_date DATE PRIMARY KEY,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            worker_id VARCHAR(128),
+            attempts INTEGER DEFAULT 0,
+            heartbeat_at TIMESTAMP,
+            last_error TEXT,
+            processed INTEGER DEFAULT 0,
+            stored INTEGER DEFAULT 0,
+            empty_result BOOLEAN DEFAULT FALSE,
+            retry_after TIMESTAMP,
+            created_at TIMESTAMP DEFAULT NOW(),
+            finished_at TIMESTAMP
+        )
+        """
+        self.cursor.execute(table_sql)
+        self.logger.info("Таблица 'backfill_queue' создана")
+
+    def ensure_digest_table_exists(self):
+        table_sql = """
+        CREATE TABLE IF NOT EXISTS day_digest (
+            load_date DATE PRIMARY KEY,
+            record_count INTEGER NOT NULL,
+            digest VARCHAR(16) NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+        """
+        self.cursor.execute(table_sql)
+        self.logger.info("Таблица 'day_digest' создана")
+
     def ensure_tables_exist(self):
         self.ensure_table_exists()
+        self.ensure_sketch_table_exists()
+        self.ensure_load_log_table_exists()
+        self.ensure_backfill_queue_table_exists()
+        self.ensure_digest_table_exists()
     
     def store_sales_batch(self, sales_data: List[Dict[str, Any]]) -> int:
         if not sales_data:
@@ -67,29 +147,9 @@ class PostgreSQLStorage:
         self.logger.info(f"Сохраняем {len(sales_data):,} записей")
         
         try:
-            purchase_values = []
-            for sale in sales_data:
-                if sale.get('quantity', 0) > 0 and sale.get('total_price', 0) > 0:
-                    purchase_values.append((
-                        sale.get("client_id"),
-                        sale.get("gender"),
-                        sale.get("product_id"),
-                        sale.get("quantity"),
-                        sale.get("price_per_item"),
-                        sale.get("discount_per_item"),
-                        sale.get("total_price"),
-                        sale.get("purchase_datetime"),
-                        sale.get("purchase_time_as_seconds_from_midnight", 0)
-                    ))            
+            purchase_values = self._build_purchase_values(sales_data)
             if purchase_values:
-                query = """
-                    INSERT INTO purchase (
-                        client_id, gender, product_id, quantity,
-                        price_per_item, discount_per_item, total_price,
-                        purchase_datetime, purchase_time_as_seconds_from_midnight
-                    ) VALUES %s
-                """
-                execute_values(self.cursor, query, purchase_values)
+                execute_values(self.cursor, self.PURCHASE_INSERT_SQL, purchase_values)
                 saved_count = len(purchase_values)
                 self.logger.info(f"СОХРАНЕНО {saved_count:,} записей в таблицу purchase!")
                 return saved_count
@@ -101,6 +161,334 @@ class PostgreSQLStorage:
             self.logger.error(f"Ошибка сохранения: {e}")
             return 0
     
+    def replace_day_batch(
+        self, load_date: date, sales_data: List[Dict[str, Any]], owner_worker_id: Optional[str] = None
+    ) -> int:
+        stored_count = self._rewrite_day(load_date, self._build_purchase_values(sales_data), owner_worker_id)
+        return stored_count or 0
+    
+    def clear_day(self, load_date: date) -> bool:
+        return self._rewrite_day(load_date, []) is not None
+    
+    def _rewrite_day(
+        self, load_date: date, purchase_values: List[tuple], owner_worker_id: Optional[str] = None
+    ) -> Optional[int]:
+        # Удаление и вставка дня в одной транзакции: повторная загрузка не дублирует строки.
+        # Advisory-lock на день сериализует параллельные перезаписи: без него при
+        # READ COMMITTED DELETE не видит чужой незакоммиченный INSERT того же дня.
+        # None означает ошибку записи; потеря задачи воркером — DayOwnershipLost
+        self.connection.autocommit = False
+        try:
+            with self.connection.cursor() as tx_cursor:
+                tx_cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s, %s::date - DATE '2000-01-01')",
+                    (self.DAY_LOCK_NAMESPACE, load_date)
+                )
+                if owner_worker_id is not None:
+                    tx_cursor.execute(
+                        """
+                        SELECT 1 FROM backfill_queue
+                        WHERE load_date = %s AND worker_id = %s AND status = 'running'
+                        FOR UPDATE
+                        """,
+                        (load_date, owner_worker_id)
+                    )
+                    if tx_cursor.fetchone() is None:
+                        raise DayOwnershipLost(
+                            f"День {load_date} больше не принадлежит {owner_worker_id}, запись отменена"
+                        )
+                tx_cursor.execute(
+                    """
+                    DELETE FROM purchase
+                    WHERE purchase_datetime >= %s AND purchase_datetime < %s::date + 1
+                    """,
+                    (load_date, load_date)
+                )
+                replaced_count = tx_cursor.rowcount
+                if purchase_values:
+                    execute_values(tx_cursor, self.PURCHASE_INSERT_SQL, purchase_values)
+                else:
+                    tx_cursor.execute(
+                        "DELETE FROM daily_sales_sketch WHERE sale_date = %s", (load_date,)
+                    )
+            self.connection.commit()
+            self.logger.info(
+                f"День {load_date} перезаписан: удалено {replaced_count:,}, "
+                f"сохранено {len(purchase_values):,}"
+            )
+            return len(purchase_values)
+        except DayOwnershipLost as ownership_error:
+            self.connection.rollback()
+            self.logger.warning(str(ownership_error))
+            raise
+        except Exception as e:
+            self.connection.rollback()
+            self.logger.error(f"Ошибка перезаписи дня {load_date}: {e}")
+            return None
+        finally:
+            self.connection.autocommit = True
+    
+    def _build_purchase_values(self, sales_data: List[Dict[str, Any]]) -> List[tuple]:
+        purchase_values = []
+        for sale in sales_data:
+            if sale.get('quantity', 0) > 0 and sale.get('total_price', 0) > 0:
+                purchase_values.append((
+                    sale.get("client_id"),
+                    sale.get("gender"),
+                    sale.get("product_id"),
+                    sale.get("quantity"),
+                    sale.get("price_per_item"),
+                    sale.get("discount_per_item"),
+                    sale.get("total_price"),
+                    sale.get("purchase_datetime"),
+                    sale.get("purchase_time_as_seconds_from_midnight", 0)
+                ))
+        return purchase_values
+    
+    def store_daily_sketches(self, sketches: Dict[date, DailySalesSketch]) -> int:
+        if not sketches:
+            return 0
+        
+        try:
+            sketch_values = [
+                (sale_date, Json(sketch.to_dict()))
+                for sale_date, sketch in sketches.items()
+            ]
+            query = """
+                INSERT INTO daily_sales_sketch (sale_date, sketch) VALUES %s
+                ON CONFLICT (sale_date) DO UPDATE
+                SET sketch = EXCLUDED.sketch, updated_at = NOW()
+            """
+            execute_values(self.cursor, query, sketch_values)
+            self.logger.info(f"Скетчи сохранены за {len(sketch_values)} дн.")
+            return len(sketch_values)
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения скетчей: {e}")
+            return 0
+    
+    def load_daily_sketches(self, start_date: date, end_date: date) -> Dict[date, DailySalesSketch]:
+        self.cursor.execute(
+            """
+            SELECT sale_date, sketch FROM daily_sales_sketch
+            WHERE sale_date BETWEEN %s AND %s
+            ORDER BY sale_date
+            """,
+            (start_date, end_date)
+        )
+        return {
+            sale_date: DailySalesSketch.from_dict(payload)
+            for sale_date, payload in self.cursor.fetchall()
+        }
+    
+    def get_period_summary(self, start_date: date, end_date: date, top_limit: int = 10) -> Dict[str, Any]:
+        # Неделя/месяц/год собираются слиянием дневных скетчей без скана purchase
+        sketches = self.load_daily_sketches(start_date, end_date)
+        summary = merge_daily_sketches(sketches).summary(top_limit)
+        # Скетчи есть только у дней, загруженных после их появления: неполное покрытие
+        # означает, что приближенные метрики посчитаны не по всему периоду
+        expected_days = (end_date - start_date).days + 1
+        summary['days'] = len(sketches)
+        summary['expected_days'] = expected_days
+        summary['missing_dates'] = [
+            (start_date + timedelta(days=offset)).isoformat()
+            for offset in range(expected_days)
+            if start_date + timedelta(days=offset) not in sketches
+        ]
+        return summary
+    
+    def store_day_digest(self, load_date: date, record_count: int, digest: str):
+        self.cursor.execute(
+            """
+            INSERT INTO day_digest (load_date, record_count, digest)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (load_date) DO UPDATE
+            SET record_count = EXCLUDED.record_count,
+                digest = EXCLUDED.digest,
+                updated_at = NOW()
+            """,
+            (load_date, record_count, digest)
+        )
+    
+    def get_day_digests(self, start_date: date, end_date: date) -> Dict[date, tuple]:
+        self.cursor.execute(
+            """
+            SELECT load_date, record_count, digest FROM day_digest
+            WHERE load_date BETWEEN %s AND %s
+            """,
+            (start_date, end_date)
+        )
+        return {
+            load_date: (record_count, digest)
+            for load_date, record_count, digest in self.cursor.fetchall()
+        }
+    
+    def record_day_load(self, load_date: date, status: str, metrics: Dict[str, int]):
+        # attempts — число неудачных попыток подряд: успех сбрасывает счетчик,
+        # чтобы пауза и лимит повторов в --serve не зависели от прошлых перезагрузок
+        self.cursor.execute(
+            """
+            INSERT INTO etl_load_log (load_date, status, processed, stored, errors, attempts)
+            VALUES (%s, %s, %s, %s, %s, CASE WHEN %s = 'success' THEN 0 ELSE 1 END)
+            ON CONFLICT (load_date) DO UPDATE
+            SET status = EXCLUDED.status,
+                processed = EXCLUDED.processed,
+                stored = EXCLUDED.stored,
+                errors = EXCLUDED.errors,
+                attempts = CASE
+                    WHEN EXCLUDED.status = 'success' THEN 0
+                    ELSE etl_load_log.attempts + 1
+                END,
+                finished_at = NOW()
+            """,
+            (load_date, status, metrics.get('processed', 0),
+             metrics.get('stored', 0), metrics.get('errors', 0), status)
+        )
+    
+    def get_day_load_states(self, start_date: date, end_date: date) -> Dict[date, Dict[str, Any]]:
+        # Статус дня берется из etl_load_log; по purchase определяются только дни,
+        # загруженные до появления журнала (у них нет строки в etl_load_log)
+        self.cursor.execute(
+            """
+            SELECT day::date, log.status, log.attempts, log.finished_at,
+                   EXTRACT(EPOCH FROM NOW() - log.finished_at) AS seconds_since_attempt,
+                   log.load_date IS NULL AND EXISTS (
+                       SELECT 1 FROM purchase
+                       WHERE purchase_datetime >= day AND purchase_datetime < day + INTERVAL '1 day'
+                   ) AS legacy_loaded
+            FROM generate_series(%s::date, %s::date, INTERVAL '1 day') AS day
+            LEFT JOIN etl_load_log AS log ON log.load_date = day::date
+            """,
+            (start_date, end_date)
+        )
+        return {
+            load_date: {
+                'status': 'success' if legacy_loaded else status,
+                'attempts': attempts or 0,
+                'finished_at': finished_at,
+                'seconds_since_attempt': float(seconds_since_attempt or 0)
+            }
+            for load_date, status, attempts, finished_at, seconds_since_attempt, legacy_loaded
+            in self.cursor.fetchall()
+        }
+    
+    def enqueue_backfill_days(self, start_date: date, end_date: date) -> int:
+        self.cursor.execute(
+            """
+            INSERT INTO backfill_queue (load_date)
+            SELECT day::date FROM generate_series(%s::date, %s::date, INTERVAL '1 day') AS day
+            ON CONFLICT (load_date) DO NOTHING
+            """,
+            (start_date, end_date)
+        )
+        queued = self.cursor.rowcount
+        self.logger.info(f"В очередь добавлено дней: {queued:,}")
+        return queued
+    
+    def claim_backfill_day(self, worker_id: str, stale_seconds: int, max_attempts: int) -> Optional[date]:
+        # Зависшие задачи (нет heartbeat дольше stale_seconds) забираются повторно,
+        # а исчерпавшие попытки помечаются как failed
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue
+            SET status = 'failed', last_error = 'heartbeat timeout'
+            WHERE status = 'running' AND attempts >= %s
+              AND heartbeat_at < NOW() - make_interval(secs => %s)
+            """,
+            (max_attempts, stale_seconds)
+        )
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue AS queue
+            SET status = 'running', worker_id = %s,
+                attempts = queue.attempts + 1, heartbeat_at = NOW()
+            WHERE queue.load_date = (
+                SELECT load_date FROM backfill_queue
+                WHERE attempts < %s
+                  AND ((status = 'pending' AND (retry_after IS NULL OR retry_after <= NOW()))
+                       OR (status = 'running'
+                           AND heartbeat_at < NOW() - make_interval(secs => %s)))
+                ORDER BY load_date
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING queue.load_date
+            """,
+            (worker_id, max_attempts, stale_seconds)
+        )
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def heartbeat_backfill_day(self, load_date: date, worker_id: str) -> bool:
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue SET heartbeat_at = NOW()
+            WHERE load_date = %s AND worker_id = %s AND status = 'running'
+            """,
+            (load_date, worker_id)
+        )
+        return self.cursor.rowcount > 0
+    
+    def complete_backfill_day(self, load_date: date, worker_id: str, metrics: Dict[str, int]) -> bool:
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue
+            SET status = 'done', processed = %s, stored = %s, empty_result = FALSE,
+                last_error = NULL, finished_at = NOW()
+            WHERE load_date = %s AND worker_id = %s AND status = 'running'
+            """,
+            (metrics.get('processed', 0), metrics.get('stored', 0), load_date, worker_id)
+        )
+        return self.cursor.rowcount > 0
+    
+    def fail_backfill_day(
+        self, load_date: date, worker_id: str, error: str, max_attempts: int, retry_delay_seconds: int
+    ) -> bool:
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                last_error = %s, heartbeat_at = NULL,
+                retry_after = NOW() + make_interval(secs => %s * attempts)
+            WHERE load_date = %s AND worker_id = %s AND status = 'running'
+            """,
+            (max_attempts, error, retry_delay_seconds, load_date, worker_id)
+        )
+        return self.cursor.rowcount > 0
+    
+    def retry_empty_backfill_day(
+        self, load_date: date, worker_id: str, max_attempts: int, retry_delay_seconds: int
+    ) -> Optional[str]:
+        # Пустой ответ API может означать сбой: день возвращается в очередь,
+        # и только после исчерпания попыток закрывается как done с empty_result
+        self.cursor.execute(
+            """
+            UPDATE backfill_queue
+            SET status = CASE WHEN attempts >= %s THEN 'done' ELSE 'pending' END,
+                empty_result = attempts >= %s,
+                finished_at = CASE WHEN attempts >= %s THEN NOW() END,
+                last_error = 'empty API response', heartbeat_at = NULL,
+                retry_after = NOW() + make_interval(secs => %s * attempts)
+            WHERE load_date = %s AND worker_id = %s AND status = 'running'
+            RETURNING status
+            """,
+            (max_attempts, max_attempts, max_attempts, retry_delay_seconds, load_date, worker_id)
+        )
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def get_backfill_progress(self) -> Dict[str, int]:
+        self.cursor.execute("SELECT status, COUNT(*) FROM backfill_queue GROUP BY status")
+        return {status: count for status, count in self.cursor.fetchall()}
+    
+    def ensure_connection(self):
+        try:
+            if not self.connection.closed:
+                self.cursor.execute("SELECT 1")
+                return
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            self.logger.warning(f"Соединение с PostgreSQL потеряно: {e}")
+        self._init_connection()
+    
     def get_total_records(self) -> int:
         try:
             self.cursor.execute("SELECT COUNT(*) FROM purchase")
@@ -1,8 +1,11 @@
 # core/data_processor.py
+import hashlib
+import json
 import pandas as pd
 from typing import List, Dict, Any, Tuple
 from basic.logger import get_logger
-from datetime import datetime
+from basic.sketches import DailySalesSketch
+from datetime import date, datetime
 
 
 class SalesDataTransformer:
@@ -14,8 +17,10 @@ class SalesDataTransformer:
     def __init__(self, service_name: str = "DataTransformer"):
         self.logger = get_logger(service_name)
         self.stats = {'valid': 0, 'invalid': 0, 'errors': []}
+        self.daily_sketches: Dict[date, DailySalesSketch] = {}
     def validate_and_normalize(self, raw_sales: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         self.stats = {'valid': 0, 'invalid': 0, 'errors': []}
+        self.daily_sketches = {}
         validated_data = []
         self.logger.info(f"Начинается обработка {len(raw_sales)} записей о продажах")       
         for idx, record in enumerate(raw_sales):
@@ -23,6 +28,7 @@ class SalesDataTransformer:
                 processed_record = self._sanitize_record(record) 
                 if self._check_business_rules(processed_record):
                     validated_data.append(processed_record)
+                    self._update_daily_sketch(processed_record)
                     self.stats['valid'] += 1
                 else:
                     self.stats['invalid'] += 1                
@@ -90,6 +96,13 @@ class SalesDataTransformer:
         seconds_offset = pd.Timedelta(seconds=record['purchase_time_as_seconds_from_midnight'])
         return base_date + seconds_offset
     
+    def _update_daily_sketch(self, record: Dict[str, Any]):
+        # Скетчи строятся в том же проходе, что и валидация
+        sale_date = record['purchase_datetime'].date()
+        if sale_date not in self.daily_sketches:
+            self.daily_sketches[sale_date] = DailySalesSketch()
+        self.daily_sketches[sale_date].add_record(record)
+    
     def _log_processing_results(self, total_count: int, valid_data: List):
         success_rate = (self.stats['valid'] / total_count * 100) if total_count > 0 else 0
         self.logger.info(
@@ -102,6 +115,9 @@ class SalesDataTransformer:
     
     def get_processing_stats(self) -> Dict[str, Any]:
         return self.stats.copy()
+    
+    def get_daily_sketches(self) -> Dict[date, DailySalesSketch]:
+        return dict(self.daily_sketches)
 
 
 # Быстрый способ использования
@@ -109,3 +125,13 @@ def process_sales_data(raw_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     processor = SalesDataTransformer()
     valid_data, errors = processor.validate_and_normalize(raw_data)
     return valid_data
+
+
+def compute_sales_digest(raw_sales: List[Dict[str, Any]]) -> Tuple[int, str]:
+    # Сумма хешей записей по модулю 2**64 не зависит от порядка строк в ответе API
+    digest = 0
+    for record in raw_sales:
+        canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+        record_hash = hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).digest()
+        digest = (digest + int.from_bytes(record_hash, 'big')) % (1 << 64)
+    return len(raw_sales), f"{digest:016x}"
@@ -0,0 +1,256 @@
+import base64
+import hashlib
+import math
+import random
+import numpy as np
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.register_count = 1 << precision
+        self.registers = np.zeros(self.register_count, dtype=np.uint8)
+
+    def add(self, value: Any):
+        hashed = int.from_bytes(
+            hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError(f"Разная точность HLL: {self.precision} и {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = self.register_count
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zero_registers = int(np.count_nonzero(self.registers == 0))
+        # Поправка для малых кардинальностей (linear counting)
+        if estimate <= 2.5 * m and zero_registers:
+            estimate = m * math.log(m / zero_registers)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'p': self.precision,
+            'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(payload['p'])
+        sketch.registers = np.frombuffer(base64.b64decode(payload['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+class QuantileSketch:
+    # Упрощенный KLL: уровни-компакторы, элемент уровня h весит 2**h
+    SHRINK_FACTOR = 2 / 3
+
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.count = 0
+        self.levels: List[List[float]] = [[]]
+        self._stored = 0
+        self._size_limit = self._max_size()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * self.SHRINK_FACTOR ** depth)) + 1
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _add_level(self):
+        # Предел размера зависит только от числа уровней, поэтому кешируется
+        self.levels.append([])
+        self._size_limit = self._max_size()
+
+    def add(self, value: float):
+        self.levels[0].append(float(value))
+        self.count += 1
+        self._stored += 1
+        if self._stored >= self._size_limit:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self._capacity(level):
+                continue
+            if level + 1 >= len(self.levels):
+                self._add_level()
+            items = sorted(self.levels[level])
+            leftover = [items.pop()] if len(items) % 2 else []
+            promoted = items[random.randint(0, 1)::2]
+            self.levels[level + 1].extend(promoted)
+            self._stored -= len(items) - len(promoted)
+            self.levels[level] = leftover
+            if self._stored < self._size_limit:
+                break
+
+    def merge(self, other: 'QuantileSketch'):
+        while len(self.levels) < len(other.levels):
+            self._add_level()
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self._stored += other._stored
+        while self._stored >= self._size_limit:
+            self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.levels)
+            for value in items
+        )
+        if not weighted:
+            return None
+        total_weight = sum(weight for _, weight in weighted)
+        threshold = q * total_weight
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= threshold:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'k': self.k, 'n': self.count, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(payload['k'])
+        sketch.count = payload['n']
+        sketch.levels = [list(items) for items in payload['levels']] or [[]]
+        sketch._stored = sum(len(items) for items in sketch.levels)
+        sketch._size_limit = sketch._max_size()
+        return sketch
+
+
+class HeavyHitters:
+    # Misra-Gries: счетчики занижены не более чем на total / (capacity + 1)
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        self.counters: Dict[str, int] = {}
+
+    def add(self, item: Any, weight: int = 1):
+        key = str(item)
+        self.total += weight
+        self.counters[key] = self.counters.get(key, 0) + weight
+        if len(self.counters) > self.capacity:
+            self._prune()
+
+    def _prune(self):
+        ordered = sorted(self.counters.values(), reverse=True)
+        cutoff = ordered[self.capacity]
+        self.counters = {
+            key: count - cutoff
+            for key, count in self.counters.items()
+            if count > cutoff
+        }
+
+    def merge(self, other: 'HeavyHitters'):
+        self.total += other.total
+        for key, count in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + count
+        if len(self.counters) > self.capacity:
+            self._prune()
+
+    def top(self, limit: int = 10) -> List[Tuple[int, int]]:
+        # Ключи хранятся строками ради JSON, наружу отдаются исходные int id
+        ranked = sorted(self.counters.items(), key=lambda pair: pair[1], reverse=True)[:limit]
+        return [(int(key), count) for key, count in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'capacity': self.capacity, 'total': self.total, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'HeavyHitters':
+        sketch = cls(payload['capacity'])
+        sketch.total = payload['total']
+        sketch.counters = dict(payload['counters'])
+        return sketch
+
+
+class DailySalesSketch:
+    def __init__(self):
+        self.rows = 0
+        self.revenue = 0.0
+        self.distinct_clients = HyperLogLog()
+        self.distinct_products = HyperLogLog()
+        self.total_price = QuantileSketch()
+        self.discount_share = QuantileSketch()
+        self.top_products = HeavyHitters()
+
+    def add_record(self, record: Dict[str, Any]):
+        self.rows += 1
+        self.revenue += record['total_price']
+        self.distinct_clients.add(record['client_id'])
+        self.distinct_products.add(record['product_id'])
+        self.total_price.add(record['total_price'])
+        if record['price_per_item'] > 0:
+            self.discount_share.add(record['discount_per_item'] / record['price_per_item'])
+        self.top_products.add(record['product_id'])
+
+    def merge(self, other: 'DailySalesSketch'):
+        self.rows += other.rows
+        self.revenue += other.revenue
+        self.distinct_clients.merge(other.distinct_clients)
+        self.distinct_products.merge(other.distinct_products)
+        self.total_price.merge(other.total_price)
+        self.discount_share.merge(other.discount_share)
+        self.top_products.merge(other.top_products)
+
+    def summary(self, top_limit: int = 10) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'revenue': round(self.revenue, 2),
+            'distinct_clients': self.distinct_clients.count(),
+            'distinct_products': self.distinct_products.count(),
+            'total_price_p50': self.total_price.quantile(0.5),
+            'total_price_p90': self.total_price.quantile(0.9),
+            'total_price_p99': self.total_price.quantile(0.99),
+            'discount_share_p50': self.discount_share.quantile(0.5),
+            'discount_share_p90': self.discount_share.quantile(0.9),
+            'top_products': self.top_products.top(top_limit)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'revenue': self.revenue,
+            'distinct_clients': self.distinct_clients.to_dict(),
+            'distinct_products': self.distinct_products.to_dict(),
+            'total_price': self.total_price.to_dict(),
+            'discount_share': self.discount_share.to_dict(),
+            'top_products': self.top_products.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'DailySalesSketch':
+        sketch = cls()
+        sketch.rows = payload['rows']
+        sketch.revenue = payload['revenue']
+        sketch.distinct_clients = HyperLogLog.from_dict(payload['distinct_clients'])
+        sketch.distinct_products = HyperLogLog.from_dict(payload['distinct_products'])
+        sketch.total_price = QuantileSketch.from_dict(payload['total_price'])
+        sketch.discount_share = QuantileSketch.from_dict(payload['discount_share'])
+        sketch.top_products = HeavyHitters.from_dict(payload['top_products'])
+        return sketch
+
+
+def merge_daily_sketches(sketches: Dict[date, DailySalesSketch]) -> DailySalesSketch:
+    merged = DailySalesSketch()
+    for sketch in sketches.values():
+        merged.merge(sketch)
+    return merged
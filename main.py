@@ -11,12 +11,16 @@ from basic.data_processor import SalesDataTransformer
 from basic.client_db import PostgreSQLStorage
 from pipeline.daily_pipeline import YesterdaySalesProcessor, run_daily_etl
 from pipeline.historical_pipeline import FullHistoryImporter, import_full_history
+from pipeline.scheduled_service import ResidentSalesService
+from pipeline.backfill_queue import BackfillQueuePlanner, BackfillQueueWorker
+from pipeline.reconciliation import RecentDaysReconciler
 from basic.logger import get_logger
 
 
 class MarketplaceETL:
-    def __init__(self, mode: str = "daily", config_dir: str = "config"):
+    def __init__(self, mode: str = "daily", config_dir: str = "config", reconcile_window: Optional[int] = None):
         self.mode = mode.lower()
+        self.reconcile_window = reconcile_window
         self.config_path = Path(config_dir) / "config.env"
         self.logger = get_logger("MarketplaceETL")
         self.start_timestamp = datetime.now()
@@ -40,6 +44,24 @@ class MarketplaceETL:
             self.pipeline_strategy = FullHistoryImporter(
                 self.api_client, self.data_processor, self.db_storage
             )
+        elif self.mode == "queue":
+            self.pipeline_strategy = BackfillQueuePlanner(
+                self.api_client, self.data_processor, self.db_storage
+            )
+        elif self.mode == "worker":
+            self.pipeline_strategy = BackfillQueueWorker(
+                self.api_client, self.data_processor, self.db_storage,
+                PostgreSQLStorage("ETL_Heartbeat")
+            )
+        elif self.mode == "reconcile":
+            self.pipeline_strategy = RecentDaysReconciler(
+                self.api_client, self.data_processor, self.db_storage,
+                window_days=self.reconcile_window
+            )
+        elif self.mode == "serve":
+            self.pipeline_strategy = ResidentSalesService(
+                self.api_client, self.data_processor, self.db_storage
+            )
         else:
             self.pipeline_strategy = YesterdaySalesProcessor(
                 self.api_client, self.data_processor, self.db_storage
@@ -92,16 +114,37 @@ class MarketplaceETL:
     def from_cli(cls) -> 'MarketplaceETL':
         import argparse    
         parser = argparse.ArgumentParser(description="ETL для маркетплейса")
-        parser.add_argument('--mode', choices=['daily', 'history'], default='daily',
-                          help="Режим работы (по умолчанию: daily)")
+        parser.add_argument('--mode', choices=['daily', 'history', 'queue', 'worker', 'reconcile'], default='daily',
+                          help="Режим работы (по умолчанию: daily); queue/worker — распределенная история")
+        parser.add_argument('--serve', action='store_true',
+                          help="Резидентный режим: загрузка по расписанию и догрузка пропусков")
+        parser.add_argument('--window', type=int, default=None,
+                          help="Окно сверки в днях для режима reconcile (по умолчанию: RECONCILE_WINDOW_DAYS)")
         parser.add_argument('--config', default='config', 
                           help="Папка с конфигурацией")   
         args = parser.parse_args()
-        return cls(mode=args.mode, config_dir=args.config)
+        if args.window is not None and args.window < 1:
+            parser.error("--window должен быть не меньше 1")
+        mode = "serve" if args.serve else args.mode
+        return cls(mode=mode, config_dir=args.config, reconcile_window=args.window)
+
+
+def _exit_code(mode: str, results: dict) -> int:
+    # Сверка и воркеры запускаются по расписанию: неудачные дни должны видеть cron и алерты
+    if mode in ("reconcile", "worker"):
+        return 1 if results.get('failed', 0) else 0
+    if mode in ("serve", "queue"):
+        return 0
+    return 0 if results.get('stored', 0) > 0 else 1
 
 
 def main():
     try:
+        if len(sys.argv) > 1:
+            app = MarketplaceETL.from_cli()
+            results = app.execute()
+            sys.exit(_exit_code(app.mode, results))
+
         config_path = Path("config") / "config.env"
         if not config_path.exists():
             raise FileNotFoundError(f"НЕ НАЙДЕН: {config_path}")
@@ -0,0 +1,158 @@
+import os
+import socket
+import threading
+import time
+from datetime import date, timedelta
+from typing import Optional
+from basic.client_db import DayOwnershipLost
+from pipeline.historical_pipeline import FullHistoryImporter
+from pipeline.orchestrator import DataPipelineCoordinator
+
+
+class BackfillQueuePlanner(FullHistoryImporter):
+    def __init__(
+        self,
+        api_service,
+        data_processor,
+        database_storage,
+        earliest_date: date = date(2020, 1, 1),
+        service_name: str = "BackfillPlanner"
+    ):
+        super().__init__(api_service, data_processor, database_storage, earliest_date, service_name)
+
+    def execute(self, custom_start: Optional[date] = None, custom_end: Optional[date] = None) -> dict:
+        self.logger.info("Формирование очереди исторической загрузки")
+        start_date = custom_start or self._discover_first_available_date()
+        end_date = custom_end or (date.today() - timedelta(days=1))
+        queued = self.database_store.enqueue_backfill_days(start_date, end_date)
+        progress = self.database_store.get_backfill_progress()
+        self.logger.info(f"Диапазон: {start_date} → {end_date}, новых дней в очереди: {queued:,}")
+        self.logger.info(f"Состояние очереди: {progress}")
+        return {**self._daily_metrics, 'queued': queued}
+
+
+class BackfillQueueWorker(DataPipelineCoordinator):
+    def __init__(
+        self,
+        api_service,
+        data_processor,
+        database_storage,
+        heartbeat_storage,
+        worker_id: Optional[str] = None,
+        heartbeat_seconds: Optional[int] = None,
+        stale_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay_seconds: Optional[int] = None,
+        service_name: str = "BackfillWorker"
+    ):
+        super().__init__(api_service, data_processor, database_storage, service_name)
+        # Heartbeat идет из отдельного потока, поэтому у него свое соединение с БД
+        self.heartbeat_store = heartbeat_storage
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_seconds = heartbeat_seconds or int(os.getenv('BACKFILL_HEARTBEAT_SECONDS', '30'))
+        self.stale_seconds = stale_seconds or int(os.getenv('BACKFILL_STALE_SECONDS', '300'))
+        self.max_attempts = max_attempts or int(os.getenv('BACKFILL_MAX_ATTEMPTS', '3'))
+        self.retry_delay_seconds = retry_delay_seconds or int(os.getenv('BACKFILL_RETRY_DELAY_SECONDS', '60'))
+        self.days_done = 0
+        self.days_empty = 0
+        self.days_failed = 0
+        self._claim_lost = threading.Event()
+
+    def execute(self) -> dict:
+        self.logger.info(f"Воркер {self.worker_id} запущен")
+        self._daily_metrics = {'processed': 0, 'stored': 0, 'errors': 0}
+        try:
+            while True:
+                target_date = self.database_store.claim_backfill_day(
+                    self.worker_id, self.stale_seconds, self.max_attempts
+                )
+                if target_date is None:
+                    # Пока другие воркеры держат задачи, ждем: они могут упасть.
+                    # Отложенные pending-дни станут доступны после retry_after
+                    progress = self.database_store.get_backfill_progress()
+                    if not progress.get('running', 0) and not progress.get('pending', 0):
+                        break
+                    time.sleep(self.heartbeat_seconds)
+                    continue
+                self._run_claimed_day(target_date)
+        finally:
+            self.heartbeat_store.disconnect()
+
+        self.logger.info(
+            f"Воркер {self.worker_id} завершен: дней {self.days_done}, "
+            f"пустых {self.days_empty}, неудачных {self.days_failed}, сохранено {self._daily_metrics['stored']:,}"
+        )
+        return {
+            **self.get_pipeline_stats(),
+            'done': self.days_done,
+            'empty': self.days_empty,
+            'failed': self.days_failed
+        }
+
+    def _store_day(self, target_date: date, clean_data: list) -> int:
+        # Задача могла быть частично выполнена упавшим воркером
+        if self._claim_lost.is_set():
+            raise RuntimeError(f"задача {target_date} перехвачена другим воркером")
+        try:
+            return self.database_store.replace_day_batch(
+                target_date, clean_data, owner_worker_id=self.worker_id
+            )
+        except DayOwnershipLost:
+            # Heartbeat мог еще не заметить перехват: результат отбрасывается как при _claim_lost
+            self._claim_lost.set()
+            raise
+
+    def _run_claimed_day(self, target_date: date):
+        self._claim_lost.clear()
+        stop_heartbeat = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(target_date, stop_heartbeat),
+            name=f"heartbeat-{target_date}",
+            daemon=True
+        )
+        heartbeat_thread.start()
+        try:
+            success, day_metrics = self._process_day_with_metrics(target_date)
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        if self._claim_lost.is_set():
+            self.logger.warning(f"День {target_date} перехвачен другим воркером, результат отброшен")
+            return
+
+        status = self._resolve_day_status(success, day_metrics)
+        if status == 'failed':
+            self.days_failed += 1
+            self.database_store.fail_backfill_day(
+                target_date, self.worker_id, f"status={status}, {day_metrics}",
+                self.max_attempts, self.retry_delay_seconds
+            )
+            return
+
+        if status == 'empty':
+            # fetch_sales_data возвращает [] и при сбоях API, поэтому день повторяется
+            queue_status = self.database_store.retry_empty_backfill_day(
+                target_date, self.worker_id, self.max_attempts, self.retry_delay_seconds
+            )
+            if queue_status == 'done':
+                self.days_empty += 1
+                self.database_store.record_day_load(target_date, status, day_metrics)
+            return
+
+        if not self.database_store.complete_backfill_day(target_date, self.worker_id, day_metrics):
+            self.logger.warning(f"День {target_date} уже перехвачен другим воркером")
+            return
+        self.days_done += 1
+        self.database_store.record_day_load(target_date, status, day_metrics)
+
+    def _heartbeat_loop(self, target_date: date, stop_event: threading.Event):
+        while not stop_event.wait(self.heartbeat_seconds):
+            try:
+                if not self.heartbeat_store.heartbeat_backfill_day(target_date, self.worker_id):
+                    self.logger.warning(f"Потеряно владение задачей {target_date}")
+                    self._claim_lost.set()
+                    return
+            except Exception as heartbeat_error:
+                self.logger.error(f"Ошибка heartbeat для {target_date}: {heartbeat_error}")
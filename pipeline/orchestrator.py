@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from datetime import date, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from basic.logger import get_logger
+from basic.data_processor import compute_sales_digest
 
 
 class DataPipelineCoordinator(ABC):
@@ -18,33 +19,91 @@ class DataPipelineCoordinator(ABC):
         self.logger = get_logger(pipeline_name)
         self._daily_metrics = {'processed': 0, 'stored': 0, 'errors': 0}
     
-    def _process_single_day(self, target_date: date) -> bool:
+    def _process_single_day(
+        self, target_date: date, raw_sales: Optional[list] = None,
+        sales_digest: Optional[Tuple[int, str]] = None
+    ) -> bool:
         self.logger.info(f"Обработка данных за {target_date}")
         
         try:
-            raw_sales = self.api_fetcher.fetch_sales_data(target_date.isoformat())
+            if raw_sales is None:
+                raw_sales = self.api_fetcher.fetch_sales_data(target_date.isoformat())
             if not raw_sales:
                 self.logger.info(f"Нет продаж за {target_date}")
                 return True
-            clean_data, validation_errors = self.data_processor.validate_and_normalize(raw_sales)
-            self._daily_metrics['processed'] += len(clean_data)
-            self._daily_metrics['errors'] += len(validation_errors)
-            
-            if not clean_data:
-                self.logger.warning(f"Все {len(raw_sales)} записей отклонены валидацией")
-                return True
-            stored_count = self.database_store.store_sales_batch(clean_data)
-            self._daily_metrics['stored'] += stored_count
-            self.logger.info(
-                f"День {target_date}: обработано {len(clean_data)}, "
-                f"сохранено {stored_count}"
-            )
-            return True
+            return self._load_fetched_day(target_date, raw_sales, sales_digest)
             
         except Exception as day_error:
             self.logger.error(f"Ошибка обработки {target_date}: {day_error}")
             return False
     
+    def _load_fetched_day(
+        self, target_date: date, raw_sales: list,
+        sales_digest: Optional[Tuple[int, str]] = None
+    ) -> bool:
+        clean_data, validation_errors = self.data_processor.validate_and_normalize(raw_sales)
+        self._daily_metrics['processed'] += len(clean_data)
+        self._daily_metrics['errors'] += len(validation_errors)
+        
+        if not clean_data:
+            self.logger.warning(f"Все {len(raw_sales)} записей отклонены валидацией")
+            if not self._discard_day(target_date):
+                return False
+            self._record_day_digest(target_date, raw_sales, sales_digest)
+            return True
+        stored_count = self._store_day(target_date, clean_data)
+        self._daily_metrics['stored'] += stored_count
+        if stored_count:
+            # Без скетча день не считается загруженным, иначе daily_sales_sketch разойдется с purchase
+            daily_sketches = self.data_processor.get_daily_sketches()
+            if self.database_store.store_daily_sketches(daily_sketches) < len(daily_sketches):
+                self.logger.error(f"День {target_date}: скетчи не сохранены")
+                return False
+            self._record_day_digest(target_date, raw_sales, sales_digest)
+        self.logger.info(
+            f"День {target_date}: обработано {len(clean_data)}, "
+            f"сохранено {stored_count}"
+        )
+        return True
+    
+    def _record_day_digest(
+        self, target_date: date, raw_sales: list,
+        sales_digest: Optional[Tuple[int, str]] = None
+    ):
+        # Сверка уже посчитала дайджест ответа, повторно его не хешируем
+        record_count, digest = sales_digest or compute_sales_digest(raw_sales)
+        self.database_store.store_day_digest(target_date, record_count, digest)
+    
+    def _store_day(self, target_date: date, clean_data: list) -> int:
+        return self.database_store.store_sales_batch(clean_data)
+    
+    def _discard_day(self, target_date: date) -> bool:
+        # Вызывается, когда все записи дня отклонены; пайплайны с перезаписью
+        # дня удаляют здесь ранее загруженные строки
+        return True
+    
+    def _process_day_with_metrics(
+        self, target_date: date, raw_sales: Optional[list] = None,
+        sales_digest: Optional[Tuple[int, str]] = None
+    ) -> Tuple[bool, dict]:
+        before = self._daily_metrics.copy()
+        success = self._process_single_day(target_date, raw_sales, sales_digest)
+        day_metrics = {
+            key: self._daily_metrics[key] - before[key]
+            for key in self._daily_metrics
+        }
+        return success, day_metrics
+    
+    @staticmethod
+    def _resolve_day_status(success: bool, day_metrics: dict) -> str:
+        # fetch_sales_data возвращает [] и при сетевых ошибках, поэтому
+        # пустой день отличается от успешно загруженного
+        if not success or day_metrics['stored'] < day_metrics['processed']:
+            return 'failed'
+        if day_metrics['processed'] + day_metrics['errors'] == 0:
+            return 'empty'
+        return 'success'
+    
     def process_date_range(self, start_date: date, end_date: date) -> dict:
         self.logger.info(f"Запуск пайплайна с {start_date} по {end_date}")
         self._daily_metrics = {'processed': 0, 'stored': 0, 'errors': 0}     
@@ -0,0 +1,79 @@
+import os
+from datetime import date, timedelta
+from typing import Optional
+from basic.data_processor import compute_sales_digest
+from pipeline.orchestrator import DataPipelineCoordinator
+
+
+class RecentDaysReconciler(DataPipelineCoordinator):
+    def __init__(
+        self,
+        api_service,
+        data_processor,
+        database_storage,
+        window_days: Optional[int] = None,
+        service_name: str = "RecentDaysReconciler"
+    ):
+        super().__init__(api_service, data_processor, database_storage, service_name)
+        if window_days is None:
+            window_days = int(os.getenv('RECONCILE_WINDOW_DAYS', '14'))
+        if window_days < 1:
+            raise ValueError(f"Окно сверки должно быть не меньше 1 дня: {window_days}")
+        self.window_days = window_days
+        self._reconcile_metrics = {'checked': 0, 'changed': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+
+    def execute(self) -> dict:
+        end_date = date.today() - timedelta(days=1)
+        start_date = end_date - timedelta(days=self.window_days - 1)
+        self.logger.info(f"Сверка последних {self.window_days} дней: {start_date} → {end_date}")
+        self._daily_metrics = {'processed': 0, 'stored': 0, 'errors': 0}
+        self._reconcile_metrics = {'checked': 0, 'changed': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+
+        stored_digests = self.database_store.get_day_digests(start_date, end_date)
+        current_day = start_date
+        while current_day <= end_date:
+            self._reconcile_day(current_day, stored_digests.get(current_day))
+            current_day += timedelta(days=1)
+
+        self.logger.info(
+            f"Сверка завершена: проверено {self._reconcile_metrics['checked']}, "
+            f"изменилось {self._reconcile_metrics['changed']}, "
+            f"без изменений {self._reconcile_metrics['unchanged']}, "
+            f"пропущено {self._reconcile_metrics['skipped']}, "
+            f"ошибок {self._reconcile_metrics['failed']}"
+        )
+        return {**self._daily_metrics, **self._reconcile_metrics}
+
+    def _store_day(self, target_date: date, clean_data: list) -> int:
+        return self.database_store.replace_day_batch(target_date, clean_data)
+
+    def _discard_day(self, target_date: date) -> bool:
+        # Иначе старые строки остались бы под новым дайджестом навсегда
+        return self.database_store.clear_day(target_date)
+
+    def _reconcile_day(self, target_date: date, stored_digest: Optional[tuple]):
+        raw_sales = self.api_fetcher.fetch_sales_data(target_date.isoformat())
+        # Пустой ответ может быть ошибкой API: не затираем уже загруженный день
+        if not raw_sales:
+            self.logger.warning(f"{target_date}: API не вернул данных, день пропущен")
+            self._reconcile_metrics['skipped'] += 1
+            return
+
+        self._reconcile_metrics['checked'] += 1
+        current_digest = compute_sales_digest(raw_sales)
+        if stored_digest == current_digest:
+            self._reconcile_metrics['unchanged'] += 1
+            return
+
+        self.logger.info(
+            f"{target_date}: данные изменились "
+            f"({stored_digest or 'нет дайджеста'} → {current_digest}), перезагрузка"
+        )
+        success, day_metrics = self._process_day_with_metrics(
+            target_date, raw_sales, current_digest
+        )
+        status = self._resolve_day_status(success, day_metrics)
+        self._reconcile_metrics['changed'] += 1
+        if status == 'failed':
+            self._reconcile_metrics['failed'] += 1
+        self.database_store.record_day_load(target_date, status, day_metrics)
@@ -0,0 +1,197 @@
+import json
+import os
+import signal
+import threading
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from pipeline.daily_pipeline import YesterdaySalesProcessor
+
+
+class ResidentSalesService(YesterdaySalesProcessor):
+    def __init__(
+        self,
+        api_service,
+        data_processor,
+        database_storage,
+        run_at: Optional[str] = None,
+        lookback_days: Optional[int] = None,
+        check_interval_minutes: Optional[int] = None,
+        status_port: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        service_name: str = "ResidentSalesService"
+    ):
+        super().__init__(api_service, data_processor, database_storage, service_name)
+        self.run_at = time.fromisoformat(run_at or os.getenv('SERVE_RUN_AT', '07:00'))
+        self.lookback_days = lookback_days or int(os.getenv('SERVE_LOOKBACK_DAYS', '30'))
+        self.check_interval = 60 * (
+            check_interval_minutes or int(os.getenv('SERVE_CHECK_INTERVAL_MINUTES', '5'))
+        )
+        self.status_port = status_port or int(os.getenv('SERVE_STATUS_PORT', '8085'))
+        self.max_attempts = max_attempts or int(os.getenv('SERVE_MAX_ATTEMPTS', '8'))
+        self._stop_event = threading.Event()
+        self._status_lock = threading.Lock()
+        self._status_server = None
+        self._status = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'last_cycle_at': None,
+            'pending_days': [],
+            'waiting_retry': {},
+            'exhausted_days': [],
+            'last_run': None,
+            'totals': self._daily_metrics.copy()
+        }
+
+    def execute(self) -> dict:
+        self._start_status_server()
+        self._install_signal_handlers()
+        self.logger.info(
+            f"Сервис запущен | ежедневная загрузка в {self.run_at:%H:%M}, "
+            f"окно догрузки {self.lookback_days} дн., "
+            f"проверка каждые {self.check_interval // 60} мин."
+        )
+        try:
+            while not self._stop_event.is_set():
+                self._run_cycle()
+                self._stop_event.wait(self.check_interval)
+        finally:
+            self._stop_status_server()
+        self.logger.info("Сервис остановлен")
+        return self.get_pipeline_stats()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _install_signal_handlers(self):
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        except ValueError:
+            # Обработчики сигналов ставятся только из главного потока
+            pass
+
+    def _latest_due_date(self) -> date:
+        # До времени запуска вчерашний день еще может быть неполным в API
+        if datetime.now().time() >= self.run_at:
+            return self._calculate_target_date()
+        return self._calculate_target_date() - timedelta(days=1)
+
+    def _retry_delay(self, attempts: int) -> float:
+        # Экспоненциальная пауза между попытками, не больше суток
+        return min(self.check_interval * 2 ** max(attempts - 1, 0), 24 * 3600)
+
+    def _find_missing_days(self) -> List[date]:
+        end_date = self._latest_due_date()
+        start_date = end_date - timedelta(days=self.lookback_days - 1)
+        load_states = self.database_store.get_day_load_states(start_date, end_date)
+
+        due_days, waiting_retry, exhausted_days = [], {}, []
+        for load_date, state in sorted(load_states.items()):
+            if state['status'] == 'success':
+                continue
+            if state['status'] is None:
+                due_days.append(load_date)
+            elif state['attempts'] >= self.max_attempts:
+                exhausted_days.append({
+                    'date': load_date.isoformat(),
+                    'status': state['status'],
+                    'attempts': state['attempts']
+                })
+            elif state['seconds_since_attempt'] >= self._retry_delay(state['attempts']):
+                due_days.append(load_date)
+            else:
+                retry_at = state['finished_at'] + timedelta(seconds=self._retry_delay(state['attempts']))
+                waiting_retry[load_date.isoformat()] = retry_at.isoformat(timespec='seconds')
+
+        self._update_status(waiting_retry=waiting_retry, exhausted_days=exhausted_days)
+        if exhausted_days:
+            self.logger.warning(
+                f"Дней без загрузки после {self.max_attempts} попыток: {len(exhausted_days)}"
+            )
+        return due_days
+
+    def _run_cycle(self):
+        try:
+            self.database_store.ensure_connection()
+            missing_days = self._find_missing_days()
+        except Exception as cycle_error:
+            self.logger.error(f"Ошибка поиска пропусков: {cycle_error}")
+            return
+
+        self._update_status(pending_days=[day.isoformat() for day in missing_days])
+        if missing_days:
+            self.logger.info(f"Найдено незагруженных дней: {len(missing_days)}")
+
+        for target_date in missing_days:
+            if self._stop_event.is_set():
+                break
+            self._run_day(target_date)
+
+        self._update_status(last_cycle_at=datetime.now().isoformat(timespec='seconds'))
+
+    def _store_day(self, target_date: date, clean_data: list) -> int:
+        # Повторная попытка после частичной записи не должна дублировать строки
+        return self.database_store.replace_day_batch(target_date, clean_data)
+
+    def _run_day(self, target_date: date):
+        started = datetime.now()
+        success, day_metrics = self._process_day_with_metrics(target_date)
+        status = self._resolve_day_status(success, day_metrics)
+
+        try:
+            self.database_store.record_day_load(target_date, status, day_metrics)
+        except Exception as log_error:
+            self.logger.error(f"Не удалось записать статус {target_date}: {log_error}")
+
+        self._report_daily_summary(day_metrics)
+        with self._status_lock:
+            self._status['last_run'] = {
+                'date': target_date.isoformat(),
+                'status': status,
+                'duration_sec': round((datetime.now() - started).total_seconds(), 2),
+                **day_metrics
+            }
+            self._status['totals'] = self._daily_metrics.copy()
+            if target_date.isoformat() in self._status['pending_days'] and status == 'success':
+                self._status['pending_days'].remove(target_date.isoformat())
+
+    def _update_status(self, **fields):
+        with self._status_lock:
+            self._status.update(fields)
+
+    def get_status(self) -> dict:
+        with self._status_lock:
+            return json.loads(json.dumps(self._status))
+
+    def _start_status_server(self):
+        service = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/status':
+                    self.send_error(404)
+                    return
+                body = json.dumps(service.get_status(), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                service.logger.debug(f"status: {format % args}")
+
+        try:
+            self._status_server = ThreadingHTTPServer(('127.0.0.1', self.status_port), StatusHandler)
+        except OSError as bind_error:
+            self.logger.warning(f"Статус-эндпоинт не запущен (порт {self.status_port}): {bind_error}")
+            return
+        threading.Thread(
+            target=self._status_server.serve_forever, name="status-endpoint", daemon=True
+        ).start()
+        self.logger.info(f"Статус: http://127.0.0.1:{self.status_port}/status")
+
+    def _stop_status_server(self):
+        if self._status_server:
+            self._status_server.shutdown()
+            self._status_server.server_close()
+            self._status_server = None